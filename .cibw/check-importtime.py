@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# Usage: python -X importtime -c "import mpi4py" 2>&1 >/dev/null |
+#        python check-importtime.py [module]
+import argparse
+import sys
+
+parser = argparse.ArgumentParser()
+parser.add_argument("module", nargs="?", default="mpi4py")
+parser.add_argument("--max-modules", type=int, default=5)
+parser.add_argument("--max-time", type=float, default=None)  # msec
+opts = parser.parse_args()
+
+imports = []
+for line in sys.stdin:
+    if not line.startswith("import time:"):
+        continue
+    _, cumulative, name = line.split("|")
+    if cumulative.strip() == "cumulative":
+        continue
+    level = (len(name) - len(name.lstrip()) - 1) // 2
+    imports.append((level, name.strip(), int(cumulative)))
+
+modules = []
+cumulative = None
+for level, name, usec in imports:
+    if level == 0:
+        if name == opts.module:
+            cumulative = usec / 1000
+            modules.append(name)
+            break
+        modules.clear()
+    else:
+        modules.append(name)
+
+if cumulative is None:
+    sys.exit(f"module {opts.module!r} not found in importtime output")
+
+print(f"import {opts.module}: {len(modules)} modules, {cumulative:.3f} msec")
+for name in modules:
+    print(f"  {name}")
+
+errors = []
+if len(modules) > opts.max_modules:
+    errors.append(f"too many modules ({len(modules)} > {opts.max_modules})")
+if opts.max_time is not None and cumulative > opts.max_time:
+    errors.append(f"too slow ({cumulative:.3f} > {opts.max_time} msec)")
+if errors:
+    sys.exit(f"import {opts.module}: {', '.join(errors)}")
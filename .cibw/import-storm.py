@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# Simulate many MPI ranks concurrently importing mpi4py.MPI from a
+# merged wheel, using stub MPI libraries placed in various locations.
+# Usage: python import-storm.py dist/mpi4py-*.whl [-n 256]
+import argparse
+import os
+import shutil
+import statistics
+import subprocess  # noqa: S404
+import sys
+import tempfile
+import textwrap
+import time
+from pathlib import Path
+
+from wheel.wheelfile import WheelFile
+
+STUBS = {
+    "mpich": ("libmpi.so.12", []),
+    "openmpi": ("libmpi.so.40", ["ompi_mpi_comm_self"]),
+    "impi": ("libmpi.so.12", ["I_MPI_Check_image_status"]),
+    "mpiabi": ("libmpi.so", ["MPI_Abi_get_version"]),
+}
+
+STUB_SOURCE = {
+    "MPI_Get_version": """
+    int MPI_Get_version(int *v, int *sv) { *v = 4; *sv = 1; return 0; }
+    """,
+    "MPI_Abi_get_version": """
+    int MPI_Abi_get_version(int *v, int *sv) { *v = 1; *sv = 0; return 0; }
+    """,
+    "ompi_mpi_comm_self": """
+    char ompi_mpi_comm_self[64];
+    """,
+    "I_MPI_Check_image_status": """
+    int I_MPI_Check_image_status(void) { return 0; }
+    """,
+}
+
+LAYOUTS = ["venv", "user", "ldpath", "libmpi"]
+
+STRATEGIES = ["probe", "cache", "frozen", "env"]
+
+CHILD_CODE = textwrap.dedent("""
+    import time
+    t0 = time.perf_counter()
+    import mpi4py
+    import importlib.util
+    spec = importlib.util.find_spec("mpi4py.MPI")
+    t1 = time.perf_counter()
+    assert spec is not None
+    from mpi4py import _mpiabi
+    print(int((t1 - t0) * 1e6), _mpiabi._get_mpiabi())
+""")
+
+
+def compile_stub(flavor, outdir):
+    soname, symbols = STUBS[flavor]
+    outdir.mkdir(parents=True, exist_ok=True)
+    source = outdir / f"{flavor}.c"
+    code = [STUB_SOURCE["MPI_Get_version"]]
+    code += [STUB_SOURCE[symbol] for symbol in symbols]
+    source.write_text(textwrap.dedent("".join(code)), encoding="utf-8")
+    library = outdir / flavor / soname
+    library.parent.mkdir(parents=True, exist_ok=True)
+    cc = os.environ.get("CC", "cc")
+    subprocess.check_call([  # noqa: S603
+        cc,
+        "-shared",
+        "-fPIC",
+        f"-Wl,-soname,{soname}",
+        "-o",
+        str(library),
+        str(source),
+    ])
+    if soname != "libmpi.so":
+        library.with_name("libmpi.so").symlink_to(soname)
+    if flavor == "impi":
+        libfabric = outdir / flavor / "libfabric" / "libfabric.so.1"
+        libfabric.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy(library, libfabric)
+    return library
+
+
+def setup_layout(layout, library, basedir):
+    env = dict(os.environ)
+    for var in ("MPI4PY_MPIABI", "MPI4PY_LIBMPI", "MPI4PY_LIBMPI_CACHE"):
+        env.pop(var, None)
+    env["PYTHONUSERBASE"] = str(basedir / "nouser")
+    python = sys.executable
+    if layout == "venv":
+        venvdir = basedir / "venv"
+        subprocess.check_call([  # noqa: S603
+            sys.executable,
+            "-m",
+            "venv",
+            "--without-pip",
+            str(venvdir),
+        ])
+        python = str(venvdir / "bin" / "python")
+        libdir = venvdir / "lib"
+    elif layout == "user":
+        env["PYTHONUSERBASE"] = str(basedir / "user")
+        libdir = basedir / "user" / "lib"
+    else:
+        libdir = basedir / "mpi" / "lib"
+    libdir.mkdir(parents=True, exist_ok=True)
+    for entry in library.parent.iterdir():
+        target = libdir / entry.name
+        if entry.is_dir():
+            shutil.copytree(entry, target)
+        else:
+            shutil.copy(entry, target, follow_symlinks=False)
+    if layout == "ldpath":
+        ld_library_path = [str(libdir), env.get("LD_LIBRARY_PATH", "")]
+        env["LD_LIBRARY_PATH"] = os.pathsep.join(filter(None, ld_library_path))
+    if layout == "libmpi":
+        env["MPI4PY_LIBMPI"] = str(libdir / library.name)
+    return python, env
+
+
+def setup_strategy(strategy, opts, python, env, basedir):
+    sitedir = basedir / f"site-{strategy}"
+    with WheelFile(opts.wheel) as wf:
+        wf.extractall(sitedir)
+    env = dict(env)
+    env["PYTHONPATH"] = str(sitedir)
+    env["MPI4PY_LIBMPI_CACHE"] = "0"
+    if strategy == "cache":
+        env["MPI4PY_LIBMPI_CACHE"] = str(basedir / "libmpi.cache")
+        run_child(python, env)
+    if strategy == "frozen":
+        code = "from mpi4py import _mpiabi; _mpiabi._freeze()"
+        args = [python, "-c", code]
+        subprocess.run(  # noqa: S603
+            args, env=env, check=True, capture_output=True
+        )
+        env.pop("MPI4PY_LIBMPI", None)
+    if strategy == "env":
+        env["MPI4PY_MPIABI"] = opts.flavor
+    return env
+
+
+def run_child(python, env):
+    args = [python, "-c", CHILD_CODE]
+    return subprocess.run(  # noqa: S603
+        args, env=env, check=True, capture_output=True, text=True
+    )
+
+
+def run_storm(python, env, nprocs, mpiabi):
+    args = [python, "-c", CHILD_CODE]
+    procs = []
+    t0 = time.perf_counter()
+    for _ in range(nprocs):
+        proc = subprocess.Popen(  # noqa: S603
+            args,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        procs.append(proc)
+    import_times = []
+    for proc in procs:
+        output, errput = proc.communicate()
+        if proc.returncode != 0:
+            message = f"child process failed [returncode={proc.returncode}]"
+            message = f"{message}\n{errput}"
+            raise RuntimeError(message)
+        usec, detected = output.split()[-2:]
+        if detected != mpiabi:
+            message = f"detected MPI ABI {detected!r}, expected {mpiabi!r}"
+            raise RuntimeError(message)
+        import_times.append(int(usec) / 1e3)
+    total = time.perf_counter() - t0
+    return import_times, total
+
+
+def count_syscalls(python, env, basedir):
+    strace = shutil.which("strace")
+    if strace is None:
+        return None
+    output = basedir / "strace.txt"
+    subprocess.run(  # noqa: S603
+        [strace, "-f", "-c", "-o", str(output), python, "-c", CHILD_CODE],
+        env=env,
+        check=True,
+        capture_output=True,
+    )
+    calls = errors = 0
+    for line in output.read_text(encoding="utf-8").splitlines():
+        fields = line.split()
+        if len(fields) < 5 or fields[-1] == "total":
+            continue
+        try:
+            numbers = [float(field) for field in fields[:-1]]
+        except ValueError:
+            continue
+        calls += int(numbers[3])
+        errors += int(numbers[4]) if len(numbers) > 4 else 0
+    return calls, errors
+
+
+def percentile(values, p):
+    values = sorted(values)
+    index = round(p / 100 * (len(values) - 1))
+    return values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("wheel", type=Path)
+    parser.add_argument("-n", "--nprocs", type=int, default=256)
+    parser.add_argument("--flavor", choices=list(STUBS), default="mpich")
+    parser.add_argument("--layout", choices=LAYOUTS, nargs="*")
+    parser.add_argument("--strategy", choices=STRATEGIES, nargs="*")
+    parser.add_argument("--keep", action="store_true")
+    opts = parser.parse_args()
+
+    if sys.platform != "linux":
+        sys.exit("import storm simulation requires Linux")
+
+    print(f"flavor: {opts.flavor}, processes: {opts.nprocs}", flush=True)
+    header = (
+        f"{'layout':<8} {'strategy':<8} "
+        f"{'p50(ms)':>9} {'p99(ms)':>9} {'max(ms)':>9} {'wall(s)':>8} "
+        f"{'syscalls':>9} {'errors':>7}"
+    )
+    working_dir = Path(tempfile.mkdtemp())
+    try:
+        library = compile_stub(opts.flavor, working_dir / "stubs")
+        mpiabi = "mpich" if opts.flavor == "impi" else opts.flavor
+        print(header, flush=True)
+        for layout in opts.layout or LAYOUTS:
+            layout_dir = working_dir / layout
+            python, env = setup_layout(layout, library, layout_dir)
+            for strategy in opts.strategy or STRATEGIES:
+                strategy_dir = layout_dir / strategy
+                strategy_env = setup_strategy(
+                    strategy, opts, python, env, strategy_dir
+                )
+                import_times, total = run_storm(
+                    python, strategy_env, opts.nprocs, mpiabi
+                )
+                syscalls = count_syscalls(python, strategy_env, strategy_dir)
+                calls, errors = syscalls or ("n/a", "n/a")
+                print(
+                    f"{layout:<8} {strategy:<8} "
+                    f"{statistics.median(import_times):9.3f} "
+                    f"{percentile(import_times, 99):9.3f} "
+                    f"{max(import_times):9.3f} "
+                    f"{total:8.3f} "
+                    f"{calls:>9} {errors:>7}",
+                    flush=True,
+                )
+    finally:
+        if opts.keep:
+            print(f"working directory: {working_dir}")
+        else:
+            shutil.rmtree(working_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
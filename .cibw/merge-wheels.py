@@ -1,8 +1,11 @@
 #!/usr/bin/env python
 import argparse
+import calendar
 import collections
+import hashlib
 import os
 import shutil
+import sys
 import tempfile
 import textwrap
 from pathlib import Path
@@ -18,152 +21,216 @@ def zip_extract(zfile, zinfo, destination):
     destination.joinpath(zinfo.filename).chmod(permissions)
 
 
-parser = argparse.ArgumentParser()
-parser.add_argument("wheelhouse", nargs="?", default="wheelhouse")
-parser.add_argument("output_dir", nargs="?", default="dist")
-opts = parser.parse_args()
+def source_date_epoch(wheelpaths):
+    timestamp = os.environ.get("SOURCE_DATE_EPOCH")
+    if timestamp is not None:
+        return int(timestamp)
+    date_time = (1980, 1, 1, 0, 0, 0)
+    for wheelpath in wheelpaths:
+        with WheelFile(wheelpath) as wf:
+            for zinfo in wf.filelist:
+                date_time = max(date_time, zinfo.date_time)
+    return calendar.timegm(date_time)
+
+
+def fix_permissions(root_dir):
+    for path in root_dir.rglob("*"):
+        if path.is_file():
+            executable = path.stat().st_mode & 0o111
+            path.chmod(0o755 if executable else 0o644)
+
+
+def sha256sum(path):
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
 
-wheelhouse = Path(opts.wheelhouse)
-output_dir = Path(opts.output_dir)
-working_dir = Path(tempfile.mkdtemp())
 ext_suffix = ".so" if os.name == "posix" else ".pyd"
 extensions = ["mpi4py.MPI"]
 
-shutil.rmtree(output_dir, ignore_errors=True)
-output_dir.mkdir(parents=True, exist_ok=True)
-
-wheels = collections.defaultdict(list)
-for whl in sorted(wheelhouse.glob("*.whl")):
-    dist, version, py, abi, plat = whl.stem.split("-")
-    if "+" in version:  # local version
-        package = dist
-        version, sep, variant = version.partition("+")
-        variant = sep + variant
-    else:  # dist suffix
-        package, sep, variant = dist.partition("_")
-        variant = sep + variant
-    wheels[package, version, (py, abi, plat)].append(variant)
-
-for (package, version, tags), variantlist in wheels.items():
-    namever = f"{package}-{version}"
-    wheeltags = "-".join(tags)
-    root_dir = working_dir / namever
-    package_dir = root_dir / package.partition("_")[0]
-    distinfo_dir = root_dir / f"{namever}.dist-info"
-    ext_suffix_glob = f".*{ext_suffix}"
-    if tags[1] == "abi3" and tags[2].startswith("win"):
-        ext_suffix_glob = f"{ext_suffix}"
-
-    variant_registry = []
-    for i, variant in enumerate(sorted(variantlist)):
-        if variant[0] == "+":  # local version
-            dist = f"{package}"
-            distver = f"{dist}-{version}{variant}"
-        if variant[0] == "_":  # dist suffix
-            dist = f"{package}{variant}"
-            distver = f"{dist}-{version}"
-
-        wheelname = f"{distver}-{wheeltags}.whl"
-        wheelpath = wheelhouse / wheelname
-
-        if i == 0:
-            with WheelFile(wheelpath) as wf:
-                message = f"Unpacking wheel {wheelpath}..."
-                print(message, end="", flush=True)
-                for zinfo in wf.filelist:
-                    zip_extract(wf, zinfo, root_dir)
-                print("OK", flush=True)
 
-            distinfo_dir.with_stem(distver).rename(distinfo_dir)
-
-            for extension in extensions:
-                extpath = Path().joinpath(*extension.split("."))
-                for extfile in root_dir.glob(f"{extpath}{ext_suffix_glob}"):
-                    extfile.unlink()
-
-            for libdir in (
-                Path(dist).with_suffix(".libs"),
-                Path(package).with_suffix(".libs"),
-                Path(package) / ".libs",
-            ):
-                libdir = root_dir / libdir
-                if libdir.exists():
-                    libdir.rmdir()
-
-            for mpipth in ("_mpi_dll_path.pth", "mpi.pth"):
-                mpipth = root_dir / mpipth
-                if mpipth.exists():
-                    mpipth.unlink()
-
-            record = distinfo_dir / "RECORD"
-            record.unlink()
-
-            metadata = distinfo_dir / "METADATA"
-            data = metadata.read_text(encoding="utf-8")
-            data = data.replace(variant.replace("_", "-"), "")
-            data = data.replace(variant, "")
-            metadata.write_text(data, encoding="utf-8")
-
-            if int(version.partition(".")[0]) < 4:
-                pkgdata = package_dir / "mpi.cfg"
-                pkgdata.write_text("[mpi]\n", encoding="utf-8")
-
-        transtb = str.maketrans("_.", "--")
-        variant = variant[1:].translate(transtb)
-        variant_registry.append(variant)
-        with WheelFile(wheelpath) as wf:
-            extract = []
-            for zinfo in wf.filelist:
-                member = Path(zinfo.filename)
+def merge_wheels(wheelhouse, output_dir):
+    # pylint: disable=too-many-locals
+    # pylint: disable=too-many-branches
+    # pylint: disable=too-many-statements
+    working_dir = Path(tempfile.mkdtemp())
+    shutil.rmtree(output_dir, ignore_errors=True)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    wheels = collections.defaultdict(list)
+    for whl in sorted(wheelhouse.glob("*.whl")):
+        dist, version, py, abi, plat = whl.stem.split("-")
+        if "+" in version:  # local version
+            package = dist
+            version, sep, variant = version.partition("+")
+            variant = sep + variant
+        else:  # dist suffix
+            package, sep, variant = dist.partition("_")
+            variant = sep + variant
+        wheels[package, version, (py, abi, plat)].append(variant)
+
+    for (package, version, tags), variantlist in wheels.items():
+        namever = f"{package}-{version}"
+        wheeltags = "-".join(tags)
+        root_dir = working_dir / namever
+        package_dir = root_dir / package.partition("_")[0]
+        distinfo_dir = root_dir / f"{namever}.dist-info"
+        ext_suffix_glob = f".*{ext_suffix}"
+        if tags[1] == "abi3" and tags[2].startswith("win"):
+            ext_suffix_glob = f"{ext_suffix}"
+
+        variant_registry = []
+        for i, variant in enumerate(sorted(variantlist)):
+            if variant[0] == "+":  # local version
+                dist = f"{package}"
+                distver = f"{dist}-{version}{variant}"
+            if variant[0] == "_":  # dist suffix
+                dist = f"{package}{variant}"
+                distver = f"{dist}-{version}"
+
+            wheelname = f"{distver}-{wheeltags}.whl"
+            wheelpath = wheelhouse / wheelname
+
+            if i == 0:
+                with WheelFile(wheelpath) as wf:
+                    message = f"Unpacking wheel {wheelpath}..."
+                    print(message, end="", flush=True)
+                    for zinfo in wf.filelist:
+                        zip_extract(wf, zinfo, root_dir)
+                    print("OK", flush=True)
+
+                distinfo_dir.with_stem(distver).rename(distinfo_dir)
+
                 for extension in extensions:
                     extpath = Path().joinpath(*extension.split("."))
-                    if member.match(f"{extpath}{ext_suffix_glob}"):
-                        extract.append(zinfo)
-            for zinfo in extract:
-                member = Path(zinfo.filename)
-                message = f"Extracting: {member} [{variant}]..."
-                print(message, end="", flush=True)
-                zip_extract(wf, zinfo, root_dir)
-                extension = root_dir.joinpath(member)
-                extname, suffix = extension.name.split(".", 1)
-                filename = f"{extname}.{variant}.{suffix}"
-                extension.rename(extension.parent / filename)
-                print("OK", flush=True)
-
-    for py in ("py", "pyi"):
-        source = Path(__file__).parent / f"mpi4py_mpiabi.{py}"
-        pycode = source.read_text(encoding="utf-8")
-        source = package_dir / f"_mpiabi.{py}"
-        source.write_text(pycode, encoding="utf-8")
-    if tags[2].startswith("win"):
-        source = Path(__file__).parent / "mpi_dll_path.py"
-        pycode = source.read_text(encoding="utf-8")
-        source = package_dir.parent / "_mpi_dll_path.py"
-        source.write_text(pycode, encoding="utf-8")
-
-    source = package_dir / "__init__.py"
-    with source.open("a", encoding="utf-8") as fh:
-        fh.write(
-            textwrap.dedent("""\n
-        # Install MPI ABI finder
-        from . import _mpiabi  # noqa: E402
-        _mpiabi._install_finder()
-        """)
-        )
-        if variant_registry:
-            fh.write("# Register MPI ABI variants\n")
-        for variant in variant_registry:
-            for module in extensions:
-                fh.write(f"_mpiabi._register({module!r}, {variant!r})\n")
+                    extglob = f"{extpath}{ext_suffix_glob}"
+                    for extfile in root_dir.glob(extglob):
+                        extfile.unlink()
+
+                for libdir in (
+                    Path(dist).with_suffix(".libs"),
+                    Path(package).with_suffix(".libs"),
+                    Path(package) / ".libs",
+                ):
+                    libdir = root_dir / libdir
+                    if libdir.exists():
+                        libdir.rmdir()
+
+                for mpipth in ("_mpi_dll_path.pth", "mpi.pth"):
+                    mpipth = root_dir / mpipth
+                    if mpipth.exists():
+                        mpipth.unlink()
+
+                record = distinfo_dir / "RECORD"
+                record.unlink()
+
+                metadata = distinfo_dir / "METADATA"
+                data = metadata.read_text(encoding="utf-8")
+                data = data.replace(variant.replace("_", "-"), "")
+                data = data.replace(variant, "")
+                metadata.write_text(data, encoding="utf-8")
+
+                if int(version.partition(".")[0]) < 4:
+                    pkgdata = package_dir / "mpi.cfg"
+                    pkgdata.write_text("[mpi]\n", encoding="utf-8")
+
+            transtb = str.maketrans("_.", "--")
+            variant = variant[1:].translate(transtb)
+            variant_registry.append(variant)
+            with WheelFile(wheelpath) as wf:
+                extract = []
+                for zinfo in wf.filelist:
+                    member = Path(zinfo.filename)
+                    for extension in extensions:
+                        extpath = Path().joinpath(*extension.split("."))
+                        if member.match(f"{extpath}{ext_suffix_glob}"):
+                            extract.append(zinfo)
+                for zinfo in extract:
+                    member = Path(zinfo.filename)
+                    message = f"Extracting: {member} [{variant}]..."
+                    print(message, end="", flush=True)
+                    zip_extract(wf, zinfo, root_dir)
+                    extension = root_dir.joinpath(member)
+                    extname, suffix = extension.name.split(".", 1)
+                    filename = f"{extname}.{variant}.{suffix}"
+                    extension.rename(extension.parent / filename)
+                    print("OK", flush=True)
+
+        for py in ("py", "pyi"):
+            source = Path(__file__).parent / f"mpi4py_mpiabi.{py}"
+            pycode = source.read_text(encoding="utf-8")
+            source = package_dir / f"_mpiabi.{py}"
+            source.write_text(pycode, encoding="utf-8")
         if tags[2].startswith("win"):
+            source = Path(__file__).parent / "mpi_dll_path.py"
+            pycode = source.read_text(encoding="utf-8")
+            source = package_dir.parent / "_mpi_dll_path.py"
+            source.write_text(pycode, encoding="utf-8")
+
+        source = package_dir / "__init__.py"
+        with source.open("a", encoding="utf-8") as fh:
+            fh.write(
+                textwrap.dedent("""\n
+            # Install MPI ABI finder
+            from . import _mpiabi  # noqa: E402
+            _mpiabi._install_finder()
+            """)
+            )
+            if variant_registry:
+                fh.write("# Register MPI ABI variants\n")
+            for variant in variant_registry:
+                for module in extensions:
+                    fh.write(f"_mpiabi._register({module!r}, {variant!r})\n")
+            if tags[2].startswith("win"):
+                fh.write(
+                    textwrap.dedent("""\
+                # Set Windows DLL search path
+                __import__('_mpi_dll_path').install()
+                """)
+                )
             fh.write(
                 textwrap.dedent("""\
-            # Set Windows DLL search path
-            __import__('_mpi_dll_path').install()
+            # Preload MPI library and extensions
+            _mpiabi._preload_from_env()
             """)
             )
 
-    output_dir.mkdir(parents=True, exist_ok=True)
-    wheel_pack.pack(root_dir, output_dir, None)
-    shutil.rmtree(working_dir, ignore_errors=True)
-    print(flush=True)
+        fix_permissions(root_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        wheel_pack.pack(root_dir, output_dir, None)
+        shutil.rmtree(working_dir, ignore_errors=True)
+        print(flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("wheelhouse", nargs="?", default="wheelhouse")
+    parser.add_argument("output_dir", nargs="?", default="dist")
+    parser.add_argument("--verify", action="store_true")
+    opts = parser.parse_args()
+
+    wheelhouse = Path(opts.wheelhouse)
+    output_dir = Path(opts.output_dir)
+    timestamp = source_date_epoch(sorted(wheelhouse.glob("*.whl")))
+    os.environ["SOURCE_DATE_EPOCH"] = str(timestamp)
+    merge_wheels(wheelhouse, output_dir)
+
+    if opts.verify:
+        verify_dir = Path(tempfile.mkdtemp())
+        merge_wheels(wheelhouse, verify_dir)
+        mismatch = []
+        for whl in sorted(output_dir.glob("*.whl")):
+            message = f"Verifying wheel {whl}..."
+            print(message, end="", flush=True)
+            other = verify_dir / whl.name
+            if other.exists() and sha256sum(other) == sha256sum(whl):
+                print("OK", flush=True)
+            else:
+                print("FAIL", flush=True)
+                mismatch.append(whl.name)
+        shutil.rmtree(verify_dir, ignore_errors=True)
+        if mismatch:
+            sys.exit(f"non-reproducible wheels: {', '.join(mismatch)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,8 @@
 # Contact: dalcinl@gmail.com
 """Support for MPI ABI."""
 
-import importlib.machinery
-import importlib.util
 import os
 import sys
-import warnings
 
 MPIABI = None  # type: str | None
 LIBMPI = None  # type: str | None
@@ -89,7 +86,92 @@ def _dlopen_mode():
     return None
 
 
-def _dlopen_libmpi(libmpi=None):
+_LIBMPI_CACHE_SIZE = 16
+
+
+def _libmpi_cache_filename():
+    filename = os.environ.get("MPI4PY_LIBMPI_CACHE", "")
+    if filename.lower() in ("", "0", "no", "off", "false", "disable"):
+        return None
+    if filename.lower() not in ("1", "yes", "on", "true", "enable"):
+        return os.path.expanduser(filename)
+    if os.name == "nt":
+        cachedir = os.environ.get("LOCALAPPDATA") or "~"
+    else:
+        cachedir = os.environ.get("XDG_CACHE_HOME") or "~/.cache"
+    cachedir = os.path.expanduser(cachedir)
+    cache_tag = sys.implementation.cache_tag or "python"
+    return os.path.join(cachedir, "mpi4py", f"libmpi.{cache_tag}.cache")
+
+
+def _libmpi_cache_key(candidates, mode):
+    directories = [os.path.dirname(filename) for filename in candidates]
+    if sys.platform == "darwin":
+        loader_path_vars = ["DYLD_LIBRARY_PATH", "DYLD_FALLBACK_LIBRARY_PATH"]
+    elif os.name == "posix":
+        loader_path_vars = ["LD_LIBRARY_PATH"]
+        directories.append("/etc/ld.so.cache")
+    else:
+        loader_path_vars = ["PATH"]
+    for var in loader_path_vars:
+        directories.extend(os.environ.get(var, "").split(os.pathsep))
+    mtimes = {}
+    for directory in directories:
+        if directory and directory not in mtimes:
+            try:
+                mtimes[directory] = os.stat(directory).st_mtime_ns
+            except OSError:
+                mtimes[directory] = None
+    return repr((candidates, mode, sorted(mtimes.items())))
+
+
+def _libmpi_cache_load():
+    # pylint: disable=import-outside-toplevel
+    import marshal
+
+    filename = _libmpi_cache_filename()
+    if filename is None or not os.path.isfile(filename):
+        return {}
+    try:
+        with open(filename, "rb") as fh:
+            cache = marshal.load(fh)  # noqa: S302
+    except (OSError, EOFError, ValueError, TypeError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def _libmpi_cache_save(key, entry):
+    # pylint: disable=import-outside-toplevel
+    import marshal
+
+    filename = _libmpi_cache_filename()
+    if filename is None:
+        return
+    cache = _libmpi_cache_load()
+    cache.pop(key, None)
+    cache[key] = entry
+    while len(cache) > _LIBMPI_CACHE_SIZE:
+        del cache[next(iter(cache))]
+    tmpname = f"{filename}.{os.getpid()}.{os.urandom(8).hex()}.tmp"
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    try:
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        fd = os.open(tmpname, flags, 0o644)
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                marshal.dump(cache, fh)
+            os.replace(tmpname, filename)
+        except BaseException:
+            if os.path.exists(tmpname):
+                os.unlink(tmpname)
+            raise
+    except OSError as exc:
+        _verbose_info(f"cannot write cache {filename!r}: {exc}")
+
+
+def _dlopen_libmpi(libmpi=None, search=True, mode=None):
+    # pylint: disable=too-many-locals
+    # pylint: disable=too-many-branches
     # pylint: disable=too-many-statements
     # pylint: disable=import-outside-toplevel
     import ctypes as ct
@@ -184,6 +266,16 @@ def _dlopen_libmpi(libmpi=None):
             else:
                 yield entry
 
+    if mode is None:
+        mode = LIBMPI_MODE
+    if mode is None:
+        mode = _dlopen_mode()
+    if not search:
+        try:
+            return dlopen(libmpi, mode)
+        except (OSError, AttributeError) as exc:
+            message = f"cannot load MPI library\n{exc}"
+            raise RuntimeError(message) from exc
     if os.name == "posix":
         try:
             return dlopen(None)
@@ -193,18 +285,27 @@ def _dlopen_libmpi(libmpi=None):
         path = libmpi.split(os.pathsep)
     else:
         path = LIBMPI_PATH or _dlopen_rpath() or [""]
-    if LIBMPI_MODE is not None:
-        mode = LIBMPI_MODE
-    else:
-        mode = _dlopen_mode()
+    candidates = list(libmpi_paths(path))
+    cache_key = cached = None
+    if _libmpi_cache_filename() is not None:
+        cache_key = _libmpi_cache_key(candidates, mode)
+        cache_entry = _libmpi_cache_load().get(cache_key) or {}
+        cached = cache_entry.get("filename")
+    if cached in candidates:
+        candidates.remove(cached)
+        candidates.insert(0, cached)
     errors = ["cannot load MPI library"]
-    for filename in libmpi_paths(path):
+    for filename in candidates:
         try:
-            return dlopen(filename, mode)
+            lib = dlopen(filename, mode)
         except OSError as exc:
             errors.append(str(exc))
         except AttributeError as exc:
             errors.append(str(exc))
+        else:
+            if cache_key is not None and filename != cached:
+                _libmpi_cache_save(cache_key, {"filename": filename})
+            return lib
     raise RuntimeError("\n".join(errors))
 
 
@@ -245,11 +346,72 @@ def _get_mpiabi_from_string(string):
     return mpiabi
 
 
+def _config_filename():
+    dirname = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(dirname, "mpiabi.cfg")
+
+
+def _read_config():
+    filename = _config_filename()
+    if not os.path.isfile(filename):
+        return None
+    config = None
+    section = None
+    with open(filename, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line or line[0] in "#;":
+                continue
+            if line[0] == "[" and line[-1] == "]":
+                section = line[1:-1].strip()
+                if section == "mpiabi" and config is None:
+                    config = {}
+                continue
+            if section == "mpiabi":
+                key, sep, value = line.partition("=")
+                if sep:
+                    config[key.strip().lower()] = value.strip()
+    if config is None:
+        return None
+    _verbose_info(f"MPI ABI config from {filename!r}")
+    return config
+
+
+def _get_mpiabi_from_config():
+    # pylint: disable=global-statement
+    global LIBMPI_MODE
+    config = _read_config()
+    if config is None:
+        return None
+    mpiabi = config.get("mpiabi") or None
+    libmpi = config.get("libmpi") or None
+    mode = config.get("mode") or None
+    if LIBMPI_MODE is not None:
+        mode = None
+    elif mode is not None:
+        try:
+            mode = int(mode, 0)
+        except ValueError:
+            _verbose_info(f"invalid dlopen mode {mode!r} in config")
+            return None
+    if mpiabi is not None and libmpi is not None:
+        try:
+            _dlopen_libmpi(libmpi, search=False, mode=mode)
+        except RuntimeError:
+            _verbose_info(f"cannot load MPI library {libmpi!r} from config")
+            return None
+    if mpiabi is not None and mode is not None:
+        LIBMPI_MODE = mode
+    return mpiabi
+
+
 def _get_mpiabi():
     mpiabi = getattr(_get_mpiabi, "mpiabi", None)
     if mpiabi is None:
         mpiabi = MPIABI or os.environ.get("MPI4PY_MPIABI")
         libmpi = LIBMPI or os.environ.get("MPI4PY_LIBMPI")
+        if mpiabi is None and libmpi is None and not LIBMPI_PATH:
+            mpiabi = _get_mpiabi_from_config()
         if mpiabi is not None:
             mpiabi = _get_mpiabi_from_string(mpiabi)
         else:
@@ -258,6 +420,32 @@ def _get_mpiabi():
     return mpiabi
 
 
+def _freeze():
+    # pylint: disable=import-outside-toplevel
+    import configparser
+
+    mpiabi = MPIABI or os.environ.get("MPI4PY_MPIABI")
+    libmpi = LIBMPI or os.environ.get("MPI4PY_LIBMPI")
+    lib = _dlopen_libmpi(libmpi)
+    libmpi = getattr(lib, "_name", None)
+    if mpiabi is not None:
+        mpiabi = _get_mpiabi_from_string(mpiabi)
+    else:
+        mpiabi = _get_mpiabi_from_libmpi(libmpi)
+    mode = LIBMPI_MODE if LIBMPI_MODE is not None else _dlopen_mode()
+    parser = configparser.ConfigParser(interpolation=None)
+    parser["mpiabi"] = {
+        "mpiabi": mpiabi,
+        "libmpi": libmpi or "",
+        "mode": str(mode) if mode is not None else "",
+    }
+    filename = _config_filename()
+    with open(filename, "w", encoding="utf-8") as fh:
+        parser.write(fh)
+    _verbose_info(f"MPI ABI config to {filename!r}")
+    return filename
+
+
 _registry = {}  # type: dict[str, list[str]]
 
 
@@ -277,6 +465,21 @@ def _get_mpiabi_suffix(module):
     return f".{mpiabi}" if mpiabi else ""
 
 
+def _find_extension(fullname, path, mpiabi_suffix):
+    # pylint: disable=import-outside-toplevel
+    import importlib.machinery
+
+    ext_name = fullname.rpartition(".")[2]
+    extension_suffixes = importlib.machinery.EXTENSION_SUFFIXES
+    for entry in path:
+        for ext_suffix in extension_suffixes:
+            filename = f"{ext_name}{mpiabi_suffix}{ext_suffix}"
+            location = os.path.join(entry, filename)
+            if os.path.isfile(location):
+                return location
+    return None
+
+
 class _Finder:
     """MPI ABI-aware extension module finder."""
 
@@ -285,20 +488,20 @@ class _Finder:
     def find_spec(cls, fullname, path, target=None):  # noqa: ARG003
         """Find MPI ABI extension module spec."""
         # pylint: disable=unused-argument
+        # pylint: disable=import-outside-toplevel
         mpiabi_suffix = _get_mpiabi_suffix(fullname)
         if mpiabi_suffix is None:
             return None
         _verbose_info(f"MPI ABI extension module: {fullname!r}")
         _verbose_info(f"MPI ABI extension suffix: {mpiabi_suffix!r}")
-        ext_name = fullname.rpartition(".")[2]
-        extension_suffixes = importlib.machinery.EXTENSION_SUFFIXES
-        spec_from_file_location = importlib.util.spec_from_file_location
-        for entry in path:
-            for ext_suffix in extension_suffixes:
-                filename = f"{ext_name}{mpiabi_suffix}{ext_suffix}"
-                location = os.path.join(entry, filename)
-                if os.path.isfile(location):
-                    return spec_from_file_location(fullname, location)
+        location = _find_extension(fullname, path, mpiabi_suffix)
+        if location is not None:
+            import importlib.util
+
+            spec_from_file_location = importlib.util.spec_from_file_location
+            return spec_from_file_location(fullname, location)
+        import warnings
+
         warnings.warn(
             f"unsupported MPI ABI {mpiabi_suffix[1:]!r}",
             category=RuntimeWarning,
@@ -310,3 +513,48 @@ class _Finder:
 def _install_finder():
     if _Finder not in sys.meta_path:
         sys.meta_path.append(_Finder)
+
+
+_preloaded = {}  # type: dict[str, object]
+
+
+def _preload():
+    # pylint: disable=import-outside-toplevel
+    import ctypes as ct
+
+    _get_mpiabi()
+    mode = getattr(sys, "getdlopenflags", lambda: None)()
+    if mode is None:
+        mode = ct.DEFAULT_MODE
+    for fullname in _registry:
+        if fullname in _preloaded:
+            continue
+        mpiabi_suffix = _get_mpiabi_suffix(fullname)
+        if mpiabi_suffix is None:
+            continue
+        package = sys.modules.get(fullname.rpartition(".")[0])
+        path = getattr(package, "__path__", None) or []
+        location = _find_extension(fullname, path, mpiabi_suffix)
+        if location is None:
+            continue
+        try:
+            _preloaded[fullname] = ct.CDLL(location, mode)
+            _verbose_info(f"preloaded {fullname!r} from {location!r}")
+        except OSError as exc:
+            _verbose_info(f"cannot preload {fullname!r}: {exc}")
+
+
+def _preload_from_env():
+    preload = os.environ.get("MPI4PY_PRELOAD", "").lower()
+    if preload in ("1", "yes", "on", "true", "enable"):
+        try:
+            _preload()
+        except RuntimeError as exc:
+            # pylint: disable=import-outside-toplevel
+            import warnings
+
+            warnings.warn(
+                f"cannot preload MPI: {exc}",
+                category=RuntimeWarning,
+                stacklevel=2,
+            )
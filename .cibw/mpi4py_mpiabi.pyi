@@ -5,3 +5,6 @@ LIBMPI_MODE: int | None = ...
 
 def _register(module: str, mpiabi: str) -> None: ...
 def _install_finder() -> None: ...
+def _freeze() -> str: ...
+def _preload() -> None: ...
+def _preload_from_env() -> None: ...
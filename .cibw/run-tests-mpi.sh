@@ -3,6 +3,7 @@ set -euo pipefail
 
 : "${MPIEXEC=mpiexec}"
 : "${PYTHON=python}"
+scriptdir=$(dirname "${BASH_SOURCE[0]}")
 
 { set -x; } 2>/dev/null
 "$PYTHON" -m mpi4py --prefix
@@ -13,3 +14,6 @@ set -euo pipefail
 "$MPIEXEC" -n 2 "$PYTHON" -m mpi4py.bench ringtest
 "$MPIEXEC" -n 2 "$PYTHON" -m mpi4py.bench helloworld
 { set +x; } 2>/dev/null
+env -u MPI4PY_PRELOAD \
+"$PYTHON" -X importtime -c "import mpi4py" 2>&1 >/dev/null | \
+    "$PYTHON" "$scriptdir"/check-importtime.py mpi4py